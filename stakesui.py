@@ -1,7 +1,17 @@
 import streamlit as st
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+import io
+import orjson
+import os
+import random
+import re
+import sqlite3
+import threading
 import time
+from contextlib import closing
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime, timezone
 
 # --- CONFIGURATION ---
@@ -18,20 +28,204 @@ RPC_NODES = [
     "https://rpc.mainnet.sui.io:443"
 ]
 
+# Digests per sui_multiGetTransactionBlocks call (50 is the node-side maximum),
+# and how many calls are in flight at once
+BATCH_SIZE = 50
+MAX_WORKERS = 4
+
+# Seconds to wait on a node before also asking the next one
+# (stretched to 2x the node's usual latency, since full batches take a while)
+HEDGE_DELAY = 1.0
+
+# Public nodes throttle per client IP; cap calls/second to each node across all workers and sessions
+RPC_RATE_LIMIT = 5
+
+MIST_PER_SUI = 1_000_000_000
+
+# Sui transaction digests are base58-encoded 32-byte hashes
+SUI_DIGEST_RE = re.compile(r"^[1-9A-HJ-NP-Za-km-z]{43,44}$")
+
+# Per-user cache directory, independent of the directory the app is launched from
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "stakesui")
+
+# On-disk copy of fetched blocks, so restarts and interrupted runs resume from cache
+TX_CACHE_DB = os.path.join(CACHE_DIR, "sui_tx_cache.db")
+# Blocks kept in memory; older ones are still served from TX_CACHE_DB
+TX_CACHE_MAX_ENTRIES = 100_000
+
+# Validator phonebook saved between server restarts, refreshed after VALIDATOR_CACHE_TTL seconds
+VALIDATOR_CACHE_PATH = os.path.join(CACHE_DIR, "validators.json")
+VALIDATOR_CACHE_TTL = 3600
+# An empty (offline) phonebook is only kept this long before the fetch is retried
+VALIDATOR_RETRY_TTL = 60
+
+class RateLimiter:
+    """
+    Token bucket shared by the worker threads: allows a burst of `capacity` calls,
+    then `rate` calls per second. Callers only wait once the burst is spent.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            # Reserve a token now (tokens may go negative) so waiters queue in order
+            delay = (1 - self.tokens) / self.rate if self.tokens < 1 else 0
+            self.tokens -= 1
+        if delay:
+            # A little jitter so queued workers don't fire in lockstep
+            time.sleep(delay * random.uniform(1.0, 1.1))
+
+@st.cache_resource
+def get_rate_limiters():
+    # One bucket per node: a throttled node shouldn't hold back calls to the others
+    return {node: RateLimiter(rate=RPC_RATE_LIMIT, capacity=RPC_RATE_LIMIT) for node in RPC_NODES}
+
+@st.cache_resource
+def get_http_session():
+    # Keep-alive connections to every node, reused across calls and reruns,
+    # instead of a fresh TCP+TLS handshake per requests.post()
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=len(RPC_NODES), pool_maxsize=MAX_WORKERS * 2)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def get_hedge_pool():
+    # Threads that carry the individual node calls; enough for every worker to hedge across all nodes
+    return ThreadPoolExecutor(max_workers=MAX_WORKERS * len(RPC_NODES))
+
+@st.cache_resource
+def get_node_state():
+    # Per-node health shared across reruns: smoothed latency and a failure cool-down
+    return {node: {"latency_ms": 0.0, "fails": 0, "fail_until": 0.0} for node in RPC_NODES}
+
+# Resolved on the script thread; worker threads only read the globals
+SESSION = get_http_session()
+NODE_STATE = get_node_state()
+RATE_LIMITERS = get_rate_limiters()
+HEDGE_POOL = get_hedge_pool()
+
+def is_cooling(node):
+    return NODE_STATE[node]["fail_until"] > time.monotonic()
+
+def rank_nodes():
+    # Healthy nodes only, fastest first (unmeasured nodes sort as 0 ms, so each
+    # gets tried early). Cooling-down nodes are left alone until their back-off
+    # (or Retry-After) runs out; if every node is cooling, wait for the first to recover.
+    healthy = [n for n in RPC_NODES if not is_cooling(n)]
+    if healthy:
+        return sorted(healthy, key=lambda n: NODE_STATE[n]["latency_ms"])
+    node = min(RPC_NODES, key=lambda n: NODE_STATE[n]["fail_until"])
+    time.sleep(max(0, NODE_STATE[node]["fail_until"] - time.monotonic()))
+    return [node]
+
+def call_node(node, body):
+    """
+    One attempt against one node. Returns the JSON-RPC result, or None if this node didn't deliver.
+    """
+    state = NODE_STATE[node]
+    RATE_LIMITERS[node].acquire()
+    started = time.perf_counter()
+    retry_after = 0.0
+    try:
+        response = SESSION.post(node, data=body, timeout=15)
+        if response.status_code in (429, 503):
+            # Throttled: the node may say how long to stay away (seconds form only)
+            header = response.headers.get("Retry-After", "")
+            retry_after = min(60.0, float(header)) if header.isdigit() else 0.0
+        elif response.status_code == 200:
+            data = orjson.loads(response.content)
+            if "result" in data:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                with RATE_LIMITERS[node].lock:
+                    state["latency_ms"] = 0.8 * state["latency_ms"] + 0.2 * elapsed_ms if state["latency_ms"] else elapsed_ms
+                    state["fails"] = 0
+                    state["fail_until"] = 0.0
+                return data["result"]
+            # A JSON-RPC error is about the request, not the node; no penalty
+            return None
+    except Exception:
+        pass
+    # Timeout, connection error or non-200: back this node off exponentially (capped at 30s),
+    # jittered so concurrent sessions don't all come back to it at the same instant.
+    # The node's bucket lock also guards its state, since several workers may fail at once.
+    with RATE_LIMITERS[node].lock:
+        state["fails"] += 1
+        cooldown = min(30, 0.5 * 2 ** state["fails"]) * (0.5 + random.random())
+        state["fail_until"] = time.monotonic() + max(cooldown, retry_after)
+    return None
+
 def make_rpc_call(method, params):
-    for node in RPC_NODES:
-        payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
-        try:
-            response = requests.post(node, json=payload, headers=HEADERS, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                if "result" in data:
-                    return data["result"]
-        except Exception:
-            continue 
+    payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+    # Serialised once with orjson; Content-Type is already on the session headers
+    body = orjson.dumps(payload)
+
+    # Hedged fan-out: start with the best node and, if nothing has answered within
+    # the hedge delay, also ask the next one. First result wins; a node that fails
+    # outright hands over to the next immediately.
+    pending = set()
+    for node in rank_nodes():
+        # Another worker may have put this node on cool-down since the ranking
+        if is_cooling(node):
+            continue
+        pending.add(HEDGE_POOL.submit(call_node, node, body))
+        delay = max(HEDGE_DELAY, 2 * NODE_STATE[node]["latency_ms"] / 1000)
+        deadline = time.monotonic() + delay
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result is not None:
+                    return result
+            if not done:
+                break
+
+    # Every node has been asked; take whichever straggler answers
+    for future in as_completed(pending):
+        result = future.result()
+        if result is not None:
+            return result
     return None
 
+def read_validator_file(max_age):
+    # Returns the saved map if it is younger than max_age seconds (any age if None)
+    try:
+        with open(VALIDATOR_CACHE_PATH, 'rb') as f:
+            saved = orjson.loads(f.read())
+        if max_age is None or time.time() - saved['ts'] < max_age:
+            return saved['map']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+def write_validator_file(validator_map, ts=None):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{VALIDATOR_CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps({"ts": time.time() if ts is None else ts, "map": validator_map}))
+        # Atomic swap so a concurrent reader never sees a half-written file
+        os.replace(tmp_path, VALIDATOR_CACHE_PATH)
+    except OSError:
+        pass
+
+@st.cache_data(ttl=VALIDATOR_CACHE_TTL, show_spinner="Loading Phonebook...")
 def get_validator_map():
+    # Shared by every session; the active set only changes at epoch boundaries.
+    # Returns (map, fetched_at) so callers can expire an empty result early.
+    saved = read_validator_file(VALIDATOR_CACHE_TTL)
+    if saved:
+        return saved, time.time()
+
     validator_map = {}
     try:
         result = make_rpc_call("suix_getLatestSuiSystemStateV2", [])
@@ -40,11 +234,39 @@ def get_validator_map():
                 validator_map[v['suiAddress'].lower()] = v['name']
     except:
         pass
-    return validator_map
 
-def parse_single_block(block_data, validator_map, target_keyword):
+    if validator_map:
+        write_validator_file(validator_map)
+        return validator_map, time.time()
+    # RPC unreachable: a stale phonebook is still better than offline mode
+    return read_validator_file(None) or {}, time.time()
+
+def refresh_validator_map():
+    # Forget the cached phonebook. The saved copy is only marked expired, not deleted,
+    # so it still serves as the offline fallback if the refetch fails.
+    saved = read_validator_file(None)
+    if saved:
+        write_validator_file(saved, ts=0)
+    get_validator_map.clear()
+
+def find_target_names(validator_map, target_keyword):
+    """
+    Every validator name parse_single_block can report that contains one of the
+    comma-separated keywords. Built once per run so each event is a set lookup,
+    however many keywords there are.
     """
-    Extracts Timestamp, Amount, and Notes.
+    keywords = [k.strip() for k in target_keyword.split(",") if k.strip()] or [""]
+    # One case-insensitive alternation scans each name once for all keywords
+    pattern = re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE)
+    # Include the fallback names parse_single_block assigns to unmapped addresses
+    candidates = set(validator_map.values()) | {"Unknown", "Nansen (Detected)"}
+    return frozenset(name for name in candidates if pattern.search(name))
+
+def parse_single_block(block_data, validator_map, target_keyword, target_names, skip_balance_on_stake=False):
+    """
+    Extracts Timestamp, Amount (integer MIST, converted to SUI once per column), and Notes.
+    With skip_balance_on_stake, a stake to another validator goes straight to Blind Mode
+    without walking balanceChanges.
     """
     if not block_data:
         return None, None, "Network Error (Details missing)"
@@ -60,7 +282,6 @@ def parse_single_block(block_data, validator_map, target_keyword):
         except:
             timestamp_str = "Error Parsing Time"
 
-    target_clean = target_keyword.lower()
     found_items = []
     
     # --- 2. EXTRACT AMOUNT (Events) ---
@@ -69,31 +290,36 @@ def parse_single_block(block_data, validator_map, target_keyword):
         parsed = event.get('parsedJson', {})
         if 'validator_address' in parsed:
             val_addr = parsed.get('validator_address', '').lower()
-            amount_mist = float(parsed.get('amount', 0))
-            amount_sui = amount_mist / 1_000_000_000
+            # u64 amounts arrive as decimal strings; int() keeps them exact above 2**53
+            amount_mist = int(parsed.get('amount') or 0)
             
             val_name = validator_map.get(val_addr, "Unknown")
             if "0xa36a" in val_addr:
                 val_name = "Nansen (Detected)"
 
-            if target_clean in val_name.lower():
-                return timestamp_str, -amount_sui, f"✅ Staked to {val_name}"
+            if val_name in target_names:
+                return timestamp_str, -amount_mist, f"✅ Staked to {val_name}"
             
-            found_items.append((-amount_sui, f"❓ Staked to {val_name}"))
+            found_items.append((-amount_mist, f"❓ Staked to {val_name}"))
+
+    # Stake transactions don't transfer out to validator addresses, so the balance pass
+    # would only confirm the Blind Mode answer below
+    if found_items and skip_balance_on_stake:
+        return timestamp_str, found_items[0][0], f"⚠️ Blind Mode: {found_items[0][1]}"
 
     # --- 3. EXTRACT AMOUNT (Balance Changes) ---
-    for change in block_data.get('balanceChanges', []):
+    # This pass can only ever return a match; skip it when the keyword matched nobody
+    for change in block_data.get('balanceChanges', []) if target_names else ():
         owner_data = change.get('owner', {})
         if isinstance(owner_data, dict):
             owner_addr = owner_data.get('AddressOwner', '').lower()
-            amount_mist = float(change.get('amount', 0))
+            amount_mist = int(change.get('amount') or 0)
             
             if owner_addr and amount_mist < 0:
-                amount_sui = amount_mist / 1_000_000_000
                 owner_name = validator_map.get(owner_addr, "Unknown")
                 
-                if target_clean in owner_name.lower():
-                    return timestamp_str, amount_sui, f"✅ Transfer to {owner_name}"
+                if owner_name in target_names:
+                    return timestamp_str, amount_mist, f"✅ Transfer to {owner_name}"
 
     # Fallback
     if found_items:
@@ -101,98 +327,200 @@ def parse_single_block(block_data, validator_map, target_keyword):
 
     return timestamp_str, None, f"No event found for '{target_keyword}'"
 
-def fetch_batch_transactions(hashes):
-    # Fetch all details including Input/Effects/Events
+def load_stored_blocks(hashes):
+    try:
+        with closing(sqlite3.connect(TX_CACHE_DB)) as conn:
+            placeholders = ",".join("?" * len(hashes))
+            rows = conn.execute(f"SELECT digest, block FROM blocks WHERE digest IN ({placeholders})", hashes).fetchall()
+        return {digest: orjson.loads(block) for digest, block in rows}
+    except (sqlite3.Error, orjson.JSONDecodeError):
+        return {}
+
+def store_blocks(blocks):
+    try:
+        with closing(sqlite3.connect(TX_CACHE_DB)) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO blocks (digest, block) VALUES (?, ?)",
+                [(b['digest'], orjson.dumps(b)) for b in blocks]
+            )
+    except sqlite3.Error:
+        pass
+
+@st.cache_resource
+def get_tx_cache():
+    # digest -> transaction block, shared across reruns and sessions.
+    # Checkpointed transactions never change, so entries need no expiry.
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with closing(sqlite3.connect(TX_CACHE_DB)) as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS blocks (digest TEXT PRIMARY KEY, block TEXT NOT NULL)")
+    except (OSError, sqlite3.Error):
+        pass
+    return {}
+
+def trim_tx_cache(tx_cache):
+    if len(tx_cache) <= TX_CACHE_MAX_ENTRIES:
+        return
+    # Dicts keep insertion order, so drop the oldest; trim to 90% so this doesn't run every batch.
+    # list() snapshots the keys so other workers can insert meanwhile; entries can vanish
+    # at any moment, so readers must use tx_cache.get() rather than `in` followed by [].
+    excess = len(tx_cache) - int(TX_CACHE_MAX_ENTRIES * 0.9)
+    for digest in list(tx_cache)[:excess]:
+        tx_cache.pop(digest, None)
+
+def fetch_batch_transactions(hashes, tx_cache):
+    """
+    Returns (blocks, fetched). Cached blocks are returned even if the RPC call for
+    the rest fails, in which case fetched is False.
+    """
+    cached, missing = [], []
+    for h in hashes:
+        # Single lookup: another worker's trim can evict between a check and an index
+        block = tx_cache.get(h)
+        if block is None:
+            missing.append(h)
+        else:
+            cached.append(block)
+    if missing:
+        # Second tier: blocks saved to disk by earlier runs
+        stored = load_stored_blocks(missing)
+        tx_cache.update(stored)
+        trim_tx_cache(tx_cache)
+        cached += stored.values()
+        missing = [h for h in missing if h not in stored]
+    if not missing:
+        return cached, True
+
+    # Only request what parse_single_block reads (timestampMs is always returned).
+    # Input and Effects are the bulk of each block and were never used.
     params = [
-        hashes, 
+        missing, 
         {
             "showEvents": True, 
-            "showBalanceChanges": True,
-            "showInput": True,
-            "showEffects": True
+            "showBalanceChanges": True
         }
     ]
     results = make_rpc_call("sui_multiGetTransactionBlocks", params)
-    return results
+    if results is None:
+        return cached, False
+
+    # A timestamp means the block is checkpointed and therefore final
+    final_blocks = [item for item in results if item and 'digest' in item and item.get('timestampMs')]
+    for item in final_blocks:
+        tx_cache[item['digest']] = item
+    store_blocks(final_blocks)
+    trim_tx_cache(tx_cache)
+    return cached + results, True
+
+def process_batch(batch_hashes, tx_cache, v_map, target_keyword, target_names, skip_balance_on_stake):
+    """
+    Fetches and parses one batch. Runs on a worker thread, so no st.* calls here.
+    """
+    parsed = {}
+    batch_data, fetched = fetch_batch_transactions(batch_hashes, tx_cache)
+    
+    # Create lookup {digest: data}
+    batch_lookup = {item['digest']: item for item in batch_data if item and 'digest' in item}
+    # Only the digests the failed call should have returned are network errors
+    not_found = ("Error", None, "Batch Item Missing") if fetched else (None, None, "Batch Network Error")
+    
+    for tx_hash in batch_hashes:
+        if tx_hash in batch_lookup:
+            parsed[tx_hash] = parse_single_block(batch_lookup[tx_hash], v_map, target_keyword, target_names, skip_balance_on_stake)
+        else:
+            parsed[tx_hash] = not_found
+    return parsed
+
+@st.cache_data(show_spinner=False)
+def load_dataframe(file_bytes, file_name):
+    # Keyed on the file contents, so widget reruns don't re-parse the upload
+    if file_name.endswith('.csv'):
+        return pd.read_csv(io.BytesIO(file_bytes))
+    return pd.read_excel(io.BytesIO(file_bytes))
 
 # --- UI ---
 st.set_page_config(page_title="Sui API Extractor", page_icon="⚡")
 st.title("⚡ Sui Stake Extractor")
 
-if 'v_map' not in st.session_state:
-    st.session_state['v_map'] = get_validator_map()
+if st.button("🔄 Refresh validators"):
+    refresh_validator_map()
+
+v_map, fetched_at = get_validator_map()
+if not v_map and time.time() - fetched_at > VALIDATOR_RETRY_TTL:
+    # Don't keep a failed fetch for the whole TTL, but don't retry the whole
+    # node fan-out on every widget rerun either
+    get_validator_map.clear()
+    v_map, fetched_at = get_validator_map()
 
-if st.session_state['v_map']:
-    st.success(f"✅ Online Mode: Phonebook loaded ({len(st.session_state['v_map'])} validators).")
+if v_map:
+    st.success(f"✅ Online Mode: Phonebook loaded ({len(v_map)} validators).")
 else:
     st.warning("⚠️ Offline Mode: Using 'Hardcoded Detection' for Nansen.")
 
 uploaded_file = st.file_uploader("Upload CSV/Excel", type=["csv", "xlsx"])
 
 if uploaded_file:
-    if uploaded_file.name.endswith('.csv'):
-        df = pd.read_csv(uploaded_file)
-    else:
-        df = pd.read_excel(uploaded_file)
+    df = load_dataframe(uploaded_file.getvalue(), uploaded_file.name)
     
     col1, col2 = st.columns(2)
     with col1:
         cols = df.columns.tolist()
         hash_col = st.selectbox("Transaction Hash Column", cols)
     with col2:
-        target_keyword = st.text_input("Search for Validator", value="Nansen")
+        target_keyword = st.text_input("Search for Validator", value="Nansen", help="Separate several validators with commas, e.g. Nansen, Mysten")
+    scan_all_balances = st.checkbox("Also scan balance changes of stakes to other validators", value=False, help="Slower; stake transactions rarely transfer to a validator directly")
     
     if st.button("🚀 Run Turbo Extraction"):
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        # Lists for new columns
-        results_time = [None] * len(df)
-        results_amt = [None] * len(df)
-        results_notes = [None] * len(df)
-        
         # BATCH PROCESSING
-        BATCH_SIZE = 10
-        all_hashes = df[hash_col].astype(str).str.strip().tolist()
-        v_map = st.session_state.get('v_map') or {}
+        # Empty cells stay float NaN through astype(str) on newer pandas; make them ""
+        # so they are reported as invalid instead of reaching the digest regex
+        all_hashes = df[hash_col].fillna("").astype(str).str.strip().tolist()
+        # Fetch each digest once; duplicate rows share the parsed result
+        unique_hashes = list(dict.fromkeys(all_hashes))
+
+        tx_cache = get_tx_cache()
+        target_names = find_target_names(v_map, target_keyword)
 
-        total_batches = (len(all_hashes) + BATCH_SIZE - 1) // BATCH_SIZE
+        # {digest: (timestamp, amount, note)}
+        parsed_by_hash = {}
+        # One malformed digest makes the node reject its whole batch, so filter them out up front
+        valid_hashes = []
+        for tx_hash in unique_hashes:
+            if SUI_DIGEST_RE.match(tx_hash):
+                valid_hashes.append(tx_hash)
+            else:
+                parsed_by_hash[tx_hash] = (None, None, "Invalid hash format")
         
-        for i in range(0, len(all_hashes), BATCH_SIZE):
-            batch_hashes = all_hashes[i : i + BATCH_SIZE]
-            current_batch_idx = i // BATCH_SIZE
-            
-            status_text.text(f"Processing Batch {current_batch_idx + 1}/{total_batches}...")
-            progress_bar.progress((i + 1) / len(all_hashes))
-            
-            batch_data = fetch_batch_transactions(batch_hashes)
-            
-            if batch_data:
-                # Create lookup {digest: data}
-                batch_lookup = {item['digest']: item for item in batch_data if item and 'digest' in item}
+        batches = [valid_hashes[i : i + BATCH_SIZE] for i in range(0, len(valid_hashes), BATCH_SIZE)]
+        total_batches = len(batches)
+        # Redraw progress ~100 times per run instead of on every batch
+        ui_step = max(1, total_batches // 100)
+        
+        # Batches are network-bound, so overlap them; UI updates stay on this thread
+        executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        try:
+            futures = [executor.submit(process_batch, batch, tx_cache, v_map, target_keyword, target_names, not scan_all_balances) for batch in batches]
+            for done, future in enumerate(as_completed(futures), start=1):
+                parsed_by_hash.update(future.result())
                 
-                for j, tx_hash in enumerate(batch_hashes):
-                    global_index = i + j
-                    
-                    if tx_hash in batch_lookup:
-                        ts, amt, note = parse_single_block(batch_lookup[tx_hash], v_map, target_keyword)
-                        results_time[global_index] = ts
-                        results_amt[global_index] = amt
-                        results_notes[global_index] = note
-                    else:
-                        results_time[global_index] = "Error"
-                        results_amt[global_index] = None
-                        results_notes[global_index] = "Batch Item Missing"
-            else:
-                for j in range(len(batch_hashes)):
-                    results_notes[i+j] = "Batch Network Error"
-            
-            time.sleep(1) 
+                if done % ui_step == 0 or done == total_batches:
+                    status_text.text(f"Processed Batch {done}/{total_batches}...")
+                    progress_bar.progress(done / total_batches)
+        finally:
+            # On Stop or a rerun Streamlit raises here; drop the queued batches
+            # instead of working through them before the app can respond
+            executor.shutdown(wait=False, cancel_futures=True)
         
-        # Assign columns
-        df["Timestamp"] = results_time
-        df[f"Amount ({target_keyword})"] = results_amt
-        df["Notes"] = results_notes
+        # Assign columns (broadcast back onto every row, duplicates included).
+        # Explicit nullable dtypes skip per-cell inference and keep amounts numeric;
+        # amounts stay exact MIST integers until this single vectorised conversion to SUI.
+        df["Timestamp"] = pd.array([parsed_by_hash[h][0] for h in all_hashes], dtype="string")
+        amounts_mist = pd.array([parsed_by_hash[h][1] for h in all_hashes], dtype="Int64")
+        df[f"Amount ({target_keyword})"] = amounts_mist / MIST_PER_SUI
+        df["Notes"] = pd.array([parsed_by_hash[h][2] for h in all_hashes], dtype="string")
         
         # Reorder columns to put Timestamp first (optional preference)
         cols = df.columns.tolist()
@@ -202,4 +530,8 @@ if uploaded_file:
         
         st.success("✅ Done!")
         st.dataframe(df)
-        st.download_button("📥 Download CSV", df.to_csv(index=False).encode('utf-8'), "sui_results_turbo.csv", "text/csv")
+
+        # Write straight into a byte buffer instead of building a str and re-encoding it
+        csv_buffer = io.BytesIO()
+        df.to_csv(csv_buffer, index=False, encoding='utf-8')
+        st.download_button("📥 Download CSV", csv_buffer.getvalue(), "sui_results_turbo.csv", "text/csv")